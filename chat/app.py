@@ -2,25 +2,30 @@
 
 Run with:
     uv run app.py
+
+or, without auto-reload, across several worker processes:
+    uv run app.py --workers 4
 """
 
 from __future__ import annotations as _annotations
 
-import json
+import asyncio
+import hashlib
 from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Annotated
 
 import fastapi
+import httpx
 import logfire
+import orjson
 from database import Database
 from dotenv import load_dotenv
 from fastapi import Depends, Request
-from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic_ai import Agent
-from pydantic_ai.messages import ModelResponse, TextPart
 from tools import register_tools
-from utils import create_user_message, to_chat_message
+from utils import coalesce_latest, create_user_message, serialize_chat_messages
 
 load_dotenv()
 
@@ -31,6 +36,8 @@ logfire.instrument_pydantic_ai()
 # Initialize the AI agent with enhanced capabilities
 agent = Agent(
     "openai:gpt-4o",
+    # Tools make their outbound requests with the app's pooled HTTP client
+    deps_type=httpx.AsyncClient,
     system_prompt="""
     You are a helpful AI assistant with access to real-world weather and time data.
     Unlike basic chatbots, you can:
@@ -47,16 +54,49 @@ agent = Agent(
 register_tools(agent)
 
 THIS_DIR = Path(__file__).parent
+STATIC_CACHE_CONTROL = "public, max-age=300"
+# Histories at least this long are serialized in batches off the event loop
+THREADED_HISTORY_THRESHOLD = 64
+HISTORY_BATCH_SIZE = 256
+
+
+def load_static(name: str) -> tuple[bytes, str]:
+    """Read a static file once, returning its contents and an ETag."""
+    body = (THIS_DIR / name).read_bytes()
+    return body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def static_response(
+    request: Request, asset: tuple[bytes, str], media_type: str
+) -> Response:
+    """Serve a cached static file, or 304 if the client already has it."""
+    body, etag = asset
+    headers = {"cache-control": STATIC_CACHE_CONTROL, "etag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
 
 
 @asynccontextmanager
 async def lifespan(_app: fastapi.FastAPI):
-    """Manage database connection lifecycle."""
-    async with Database.connect() as db:
-        yield {"db": db}
+    """Manage database and HTTP client lifecycle and cache static files."""
+    # One pooled client for every outbound tool request, so connections are
+    # reused across tool calls instead of being re-established every time
+    http_client = httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        http2=True,
+    )
+    async with Database.connect() as db, http_client:
+        yield {
+            "db": db,
+            "http_client": http_client,
+            "html": load_static("chat_app.html"),
+            "ts": load_static("chat_app.ts"),
+        }
 
 
-app = fastapi.FastAPI(lifespan=lifespan)
+app = fastapi.FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 logfire.instrument_fastapi(app)
 
 
@@ -65,42 +105,49 @@ async def get_db(request: Request) -> Database:
     return request.state.db
 
 
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Dependency to get the shared HTTP client."""
+    return request.state.http_client
+
+
 @app.get("/")
-async def index() -> FileResponse:
+async def index(request: Request) -> Response:
     """Serve the main chat interface."""
-    return FileResponse((THIS_DIR / "chat_app.html"), media_type="text/html")
+    return static_response(request, request.state.html, "text/html")
 
 
 @app.get("/chat_app.ts")
-async def main_ts() -> FileResponse:
+async def main_ts(request: Request) -> Response:
     """Get the raw typescript code, it's compiled in the browser, forgive me."""
-    return FileResponse((THIS_DIR / "chat_app.ts"), media_type="text/plain")
+    return static_response(request, request.state.ts, "text/plain")
 
 
 @app.get("/chat/")
-async def get_chat(database: Database = Depends(get_db)) -> Response:
+async def get_chat(database: Database = Depends(get_db)) -> StreamingResponse:
     """Get all chat messages."""
     msgs = await database.get_messages()
 
-    # Filter and convert messages, skipping system-only messages
-    chat_messages = []
-    for m in msgs:
-        try:
-            chat_msg = to_chat_message(m)
-            chat_messages.append(json.dumps(chat_msg).encode("utf-8"))
-        except Exception:
-            # Skip messages that can't be converted (like system-only messages)
-            continue
-
-    return Response(
-        b"\n".join(chat_messages),
-        media_type="text/plain",
-    )
+    async def stream_history():
+        """Streams stored messages in batches as they are serialized."""
+        if len(msgs) < THREADED_HISTORY_THRESHOLD:
+            yield serialize_chat_messages(msgs)
+            return
+
+        # Serializing a long history in one go would hold up concurrent
+        # streams, so hand each batch to a worker thread instead
+        for start in range(0, len(msgs), HISTORY_BATCH_SIZE):
+            batch = msgs[start : start + HISTORY_BATCH_SIZE]
+            if body := await asyncio.to_thread(serialize_chat_messages, batch):
+                yield body
+
+    return StreamingResponse(stream_history(), media_type="text/plain")
 
 
 @app.post("/chat/")
 async def post_chat(
-    prompt: Annotated[str, fastapi.Form()], database: Database = Depends(get_db)
+    prompt: Annotated[str, fastapi.Form()],
+    database: Database = Depends(get_db),
+    http_client: httpx.AsyncClient = Depends(get_http_client),
 ) -> StreamingResponse:
     """Handle new chat messages and stream AI responses."""
 
@@ -108,17 +155,25 @@ async def post_chat(
         """Streams new line delimited JSON `Message`s to the client."""
         # Stream the user prompt so it can be displayed immediately
         user_message = create_user_message(prompt)
-        yield json.dumps(user_message).encode("utf-8") + b"\n"
+        yield orjson.dumps(user_message) + b"\n"
 
         # Get chat history to pass as context to the agent
         messages = await database.get_messages()
 
         # Run the agent with the user prompt and chat history
-        async with agent.run_stream(prompt, message_history=messages) as result:
-            async for text in result.stream_output(debounce_by=0.01):
-                # Create a ModelResponse for the frontend
-                m = ModelResponse(parts=[TextPart(text)], timestamp=result.timestamp())
-                yield json.dumps(to_chat_message(m)).encode("utf-8") + b"\n"
+        async with agent.run_stream(
+            prompt, message_history=messages, deps=http_client
+        ) as result:
+            # Role and timestamp are fixed for the whole response, so serialize
+            # them once and only encode the content string for each chunk
+            prefix = (
+                b'{"role":"model","timestamp":'
+                + orjson.dumps(result.timestamp())
+                + b',"content":'
+            )
+            chunks = coalesce_latest(result.stream_output(debounce_by=0.01))
+            async for text in chunks:
+                yield prefix + orjson.dumps(text) + b"}\n"
 
         # Save new messages to the database
         await database.add_messages(result.new_messages_json())
@@ -127,6 +182,23 @@ async def post_chat(
 
 
 if __name__ == "__main__":
+    import argparse
+
     import uvicorn
 
-    uvicorn.run("app:app", reload=True, reload_dirs=[str(THIS_DIR)])
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="run N worker processes instead of a single auto-reloading one",
+    )
+    args = parser.parse_args()
+
+    # uvloop and httptools speed up every streamed send, reload only works
+    # with a single process so it's skipped when running multiple workers
+    options = {"loop": "uvloop", "http": "httptools", "log_level": "warning"}
+    if args.workers:
+        uvicorn.run("app:app", workers=args.workers, app_dir=str(THIS_DIR), **options)
+    else:
+        uvicorn.run("app:app", reload=True, reload_dirs=[str(THIS_DIR)], **options)
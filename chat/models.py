@@ -1,13 +1,17 @@
 """Data models for the chat app."""
 
+from datetime import datetime
 from typing import Literal
 
 from typing_extensions import TypedDict
 
 
 class ChatMessage(TypedDict):
-    """Format of messages sent to the browser."""
+    """Format of messages sent to the browser.
+
+    `timestamp` is left as a datetime, orjson writes it in ISO 8601 format.
+    """
 
     role: Literal["user", "model"]
-    timestamp: str
+    timestamp: datetime
     content: str
@@ -1,63 +1,173 @@
 """Simple weather and time tools for the chat app."""
 
+import asyncio
+import functools
+import time
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, TypeVar
 
 import httpx
 from pydantic_ai import RunContext
+from typing_extensions import ParamSpec
 
 if TYPE_CHECKING:
     from pydantic_ai import Agent
 
+P = ParamSpec("P")
+R = TypeVar("R")
 
-async def get_user_location() -> str:
-    """Get user's approximate location based on IP address."""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("http://ip-api.com/json/", timeout=5)
-            response.raise_for_status()
-            data = response.json()
+DEFAULT_LOCATION = "London"
+
+
+def ttl_cache(
+    ttl: float, key: Callable[P, str], maxsize: int = 256
+) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Cache results of an async lookup for `ttl` seconds, keyed by `key(...)`.
+
+    Exceptions propagate without being cached, so a failed request is retried
+    on the next call rather than served until it expires. Expired entries are
+    evicted on write, and at most `maxsize` are kept, dropping the oldest.
+    """
+
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        entries: dict[str, tuple[float, R]] = {}
+
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            cache_key = key(*args, **kwargs)
+            now = asyncio.get_running_loop().time()
+            entry = entries.get(cache_key)
+            if entry is not None and now - entry[0] < ttl:
+                return entry[1]
+            result = await func(*args, **kwargs)
+            # Re-insert so entries stay ordered by age, oldest first
+            entries.pop(cache_key, None)
+            entries[cache_key] = (now, result)
+            while (
+                len(entries) > maxsize or now - next(iter(entries.values()))[0] >= ttl
+            ):
+                del entries[next(iter(entries))]
+            return result
+
+        wrapper.cache_clear = entries.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
+
+
+@ttl_cache(300, key=lambda client: "")
+async def lookup_user_location(client: httpx.AsyncClient) -> str:
+    """Look up the user's location from their IP address, raising on failure."""
+    response = await client.get("http://ip-api.com/json/", timeout=5)
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get("status") == "success":
+        city = data.get("city", "")
+        region = data.get("regionName", "")
+        country = data.get("country", "")
+
+        if city and region:
+            return f"{city}, {region}"
+        elif city:
+            return city
+        elif region:
+            return region
+        elif country:
+            return country
 
-            if data.get("status") == "success":
-                city = data.get("city", "")
-                region = data.get("regionName", "")
-                country = data.get("country", "")
+    raise ValueError(f"Could not resolve location from IP: {data}")
 
-                if city and region:
-                    return f"{city}, {region}"
-                elif city:
-                    return city
-                elif region:
-                    return region
-                elif country:
-                    return country
 
-        return "London"
-    except Exception:
-        return "London"
+@ttl_cache(60, key=lambda client, location: location.lower().strip())
+async def fetch_weather(client: httpx.AsyncClient, location: str) -> str:
+    """Fetch a one-line weather report for `location`."""
+    url = f"https://wttr.in/{location}?format=%C+%t+%h+%w"
+    response = await client.get(url, timeout=10)
+    response.raise_for_status()
+    return response.text.strip()
 
 
-def register_tools(agent: "Agent") -> None:
-    """Register weather and time tools with the chat agent."""
+@ttl_cache(60, key=lambda client: "")
+async def fetch_local_weather(client: httpx.AsyncClient) -> tuple[str, str]:
+    """Fetch weather wherever wttr.in geolocates the caller, as (place, report)."""
+    response = await client.get("https://wttr.in/?format=%l|%C+%t+%h+%w", timeout=10)
+    response.raise_for_status()
+    place, _, report = response.text.strip().partition("|")
+    return place, report
+
+
+def same_place(a: str, b: str) -> bool:
+    """Whether two location names refer to the same city, e.g. "Leeds, England"
+    and "Leeds, United Kingdom"."""
+    return a.split(",")[0].strip().lower() == b.split(",")[0].strip().lower()
+
+
+async def get_local_weather(client: httpx.AsyncClient) -> tuple[str, str | None]:
+    """Resolve the user's IP location, as (location, report).
+
+    The report is None when wttr.in's own guess can't stand in for the
+    location, and the caller should fetch weather for it directly.
+    """
+    # wttr.in geolocates the caller itself, so fetch that report while ip-api
+    # resolves a name, and only keep it if both agree on where the user is
+    local = asyncio.create_task(fetch_local_weather(client))
+    try:
+        try:
+            location = await lookup_user_location(client)
+        except Exception:
+            location = DEFAULT_LOCATION
+        else:
+            try:
+                place, report = await local
+            except Exception:
+                pass
+            else:
+                if same_place(location, place):
+                    return location, report
+    finally:
+        # Never leave the request running or its exception unretrieved
+        local.cancel()
+        await asyncio.gather(local, return_exceptions=True)
+    return location, None
+
+
+def register_tools(agent: "Agent[httpx.AsyncClient]") -> None:
+    """Register weather and time tools with the chat agent.
+
+    Outbound requests go through the shared client passed as the run's deps.
+    """
 
     @agent.tool
-    async def get_current_weather(ctx: RunContext, location: str = "") -> str:
+    async def get_current_weather(
+        ctx: RunContext[httpx.AsyncClient], location: str = ""
+    ) -> str:
         """Get current weather conditions for any location. If no location provided, uses user's current location."""
+        http_client = ctx.deps
         try:
             if not location:
-                location = await get_user_location()
-
-            async with httpx.AsyncClient() as client:
-                url = f"https://wttr.in/{location}?format=%C+%t+%h+%w"
-                response = await client.get(url, timeout=10)
-                response.raise_for_status()
-                return f"Weather in {location}: {response.text.strip()}"
+                location, weather = await get_local_weather(http_client)
+                if weather is None:
+                    weather = await fetch_weather(http_client, location)
+            else:
+                weather = await fetch_weather(http_client, location)
+            return f"Weather in {location}: {weather}"
         except Exception as e:
             return f"Sorry, couldn't get weather for {location}. Error: {str(e)}"
 
+    # The reported time has one second resolution, so repeated calls within
+    # the same second reuse the last formatted string
+    last_second = -1
+    last_time = ""
+
     @agent.tool
     async def get_current_time(ctx: RunContext) -> str:
         """Get the current date and time."""
-        now = datetime.now(tz=timezone.utc)
-        local_time = now.astimezone()
-        return f"Current time: {local_time.strftime('%Y-%m-%d %H:%M:%S %Z')}"
\ No newline at end of file
+        nonlocal last_second, last_time
+        second = int(time.time())
+        if second != last_second:
+            local_time = datetime.fromtimestamp(second, tz=timezone.utc).astimezone()
+            last_time = f"Current time: {local_time.strftime('%Y-%m-%d %H:%M:%S %Z')}"
+            last_second = second
+        return last_time
@@ -1,7 +1,11 @@
 """Utility functions for the chat app."""
 
+import asyncio
+from collections.abc import AsyncIterator, Callable
 from datetime import datetime, timezone
+from typing import Any
 
+import orjson
 from models import ChatMessage
 from pydantic_ai import UnexpectedModelBehavior
 from pydantic_ai.messages import (
@@ -13,37 +17,107 @@ from pydantic_ai.messages import (
 )
 
 
-def to_chat_message(m: ModelMessage) -> ChatMessage:
-    """Convert a ModelMessage to a ChatMessage for the frontend."""
-    if isinstance(m, ModelRequest):
-        # Look for the UserPromptPart, skipping SystemPromptParts
-        for part in m.parts:
-            if isinstance(part, UserPromptPart):
-                assert isinstance(part.content, str)
-                return {
-                    "role": "user",
-                    "timestamp": part.timestamp.isoformat(),
-                    "content": part.content,
-                }
-        # If no UserPromptPart found, skip this message (it's system-only)
-        raise UnexpectedModelBehavior("No user prompt found in ModelRequest")
-
-    elif isinstance(m, ModelResponse):
-        first_part = m.parts[0]
-        if isinstance(first_part, TextPart):
+def _request_to_chat_message(m: ModelRequest) -> ChatMessage:
+    # Look for the UserPromptPart, skipping SystemPromptParts
+    for part in m.parts:
+        if isinstance(part, UserPromptPart):
+            assert isinstance(part.content, str)
             return {
-                "role": "model",
-                "timestamp": m.timestamp.isoformat(),
-                "content": first_part.content,
+                "role": "user",
+                "timestamp": part.timestamp,
+                "content": part.content,
             }
+    # If no UserPromptPart found, skip this message (it's system-only)
+    raise UnexpectedModelBehavior("No user prompt found in ModelRequest")
 
+
+def _response_to_chat_message(m: ModelResponse) -> ChatMessage:
+    first_part = m.parts[0]
+    if isinstance(first_part, TextPart):
+        return {
+            "role": "model",
+            "timestamp": m.timestamp,
+            "content": first_part.content,
+        }
     raise UnexpectedModelBehavior(f"Unexpected message type for chat app: {m}")
 
 
+_CONVERTERS: dict[type, Callable[[Any], ChatMessage]] = {
+    ModelRequest: _request_to_chat_message,
+    ModelResponse: _response_to_chat_message,
+}
+
+
+def to_chat_message(m: ModelMessage) -> ChatMessage:
+    """Convert a ModelMessage to a ChatMessage for the frontend."""
+    try:
+        converter = _CONVERTERS[type(m)]
+    except KeyError:
+        raise UnexpectedModelBehavior(
+            f"Unexpected message type for chat app: {m}"
+        ) from None
+    return converter(m)
+
+
+def serialize_chat_messages(msgs: list[ModelMessage]) -> bytes:
+    """Serialize messages as newline delimited JSON `ChatMessage`s."""
+    lines = []
+    for m in msgs:
+        try:
+            chat_msg = to_chat_message(m)
+        except Exception:
+            # Skip messages that can't be converted (like system-only messages)
+            continue
+        lines.append(orjson.dumps(chat_msg) + b"\n")
+    return b"".join(lines)
+
+
 def create_user_message(content: str) -> ChatMessage:
     """Create a user ChatMessage with current timestamp."""
     return {
         "role": "user",
-        "timestamp": datetime.now(tz=timezone.utc).isoformat(),
+        "timestamp": datetime.now(tz=timezone.utc),
         "content": content,
     }
+
+
+async def coalesce_latest(
+    chunks: AsyncIterator[str], interval: float = 0.025
+) -> AsyncIterator[str]:
+    """Yield the latest chunk at most once per `interval` seconds.
+
+    Streamed output is cumulative (each chunk holds the full text so far), so
+    chunks superseded within the same window can be dropped without loss. A
+    chunk held back is flushed as soon as its window closes, even if the
+    stream has stalled, and the last chunk is always yielded.
+    """
+    loop = asyncio.get_running_loop()
+    source = aiter(chunks)
+    last_flush = float("-inf")
+    pending: str | None = None
+    # Waiting on the next chunk may time out, so it runs as a task that
+    # survives the timeout: cancelling `__anext__` would close the source
+    next_chunk: asyncio.Future[str] | None = None
+    try:
+        while True:
+            if next_chunk is None:
+                next_chunk = asyncio.ensure_future(anext(source))
+            timeout = None if pending is None else last_flush + interval - loop.time()
+            done, _ = await asyncio.wait({next_chunk}, timeout=timeout)
+            if done:
+                try:
+                    pending = next_chunk.result()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    next_chunk = None
+            now = loop.time()
+            if pending is not None and now - last_flush >= interval:
+                yield pending
+                pending = None
+                last_flush = now
+    finally:
+        if next_chunk is not None:
+            next_chunk.cancel()
+    if pending is not None:
+        yield pending
@@ -1,29 +1,49 @@
+import asyncio
+import functools
+import os
 import random
-from typing import Optional, Union
+import threading
+from dataclasses import dataclass
+from typing import Callable, Literal, Optional, Union
 
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.messages import (
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+    ToolCallPart,
+)
 
 load_dotenv()
 
 # Roulette wheel setup
-ROULETTE_NUMBERS = list(range(38))  # 0-37 (37 represents 00)
-RED_NUMBERS = {1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36}
-BLACK_NUMBERS = {2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35}
+VALID_NUMBERS = frozenset(range(38))  # 0-37 (37 represents 00)
+RED_NUMBERS = frozenset(
+    {1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36}
+)
+BLACK_NUMBERS = frozenset(
+    {2, 4, 6, 8, 10, 11, 13, 15, 17, 20, 22, 24, 26, 28, 29, 31, 33, 35}
+)
+# Color of every number, indexed by the number itself
+NUMBER_COLORS = tuple(
+    "green" if n in (0, 37) else "red" if n in RED_NUMBERS else "black"
+    for n in range(38)
+)
 
 
-class GameState(BaseModel):
-    balance: int = Field(default=1000, ge=0)
-    winning_number: Optional[int] = Field(default=None, ge=0, le=37)
-    last_spin_result: Optional[str] = None
+@dataclass(slots=True)
+class GameState:
+    balance: int = 1000
+    winning_number: int = -1  # 0-37 once the wheel has been spun
+    last_spin_result: str = ""
+    next_spin: int = -1  # drawn ahead of time while waiting for the player
 
 
 def get_number_color(number: int) -> str:
     """Get the color of a roulette number"""
-    if number in [0, 37]:
-        return "green"
-    return "red" if number in RED_NUMBERS else "black"
+    return NUMBER_COLORS[number]
 
 
 def format_number(number: int) -> str:
@@ -31,134 +51,138 @@ def format_number(number: int) -> str:
     return "00" if number == 37 else str(number)
 
 
+# Declared as a Literal so the tool schema offers the model an enum and
+# pydantic-ai rejects anything else before the tool runs
+BetType = Literal["straight", "color", "odd_even", "high_low"]
+
+# Bet types are encoded as ints at the tool boundary, indexing the tables below
+BET_STRAIGHT, BET_COLOR, BET_ODD_EVEN, BET_HIGH_LOW = 0, 1, 2, 3
+BET_TYPE_CODES: dict[BetType, int] = {
+    "straight": BET_STRAIGHT,
+    "color": BET_COLOR,
+    "odd_even": BET_ODD_EVEN,
+    "high_low": BET_HIGH_LOW,
+}
+PAYOUT_MULTIPLIERS = (36, 2, 2, 2)
+# Whether a bet wins, given the winning number and bet value (green loses
+# all even-money bets)
+WIN_PREDICATES: tuple[Callable[[int, Union[str, int]], bool], ...] = (
+    lambda wn, bv: wn == bv,
+    lambda wn, bv: NUMBER_COLORS[wn] == bv,
+    lambda wn, bv: wn != 0 and wn != 37 and (wn % 2 == 1) == (bv == "odd"),
+    lambda wn, bv: wn != 0 and wn != 37 and (wn >= 19) == (bv == "high"),
+)
+
+
 def calculate_payout(
-    bet_type: str, bet_amount: int, winning_number: int, bet_value: Union[str, int]
+    bet_type: int, bet_amount: int, winning_number: int, bet_value: Union[str, int]
 ) -> int:
     """Calculate payout (original bet + winnings) for winning bets, 0 for losing bets."""
-    if bet_type == "straight":
-        return bet_amount * 36 if winning_number == bet_value else 0
-    elif bet_type == "color":
-        return bet_amount * 2 if get_number_color(winning_number) == bet_value else 0
-    elif winning_number in [0, 37]:  # Green numbers lose all even-money bets
-        return 0
-    elif bet_type == "odd_even":
-        return (
-            bet_amount * 2 if (winning_number % 2 == 1) == (bet_value == "odd") else 0
-        )
-    elif bet_type == "high_low":
-        return bet_amount * 2 if (winning_number >= 19) == (bet_value == "high") else 0
+    if WIN_PREDICATES[bet_type](winning_number, bet_value):
+        return bet_amount * PAYOUT_MULTIPLIERS[bet_type]
     return 0
 
 
-model_choice = "openai:gpt-4o"
+def validate_straight(bet_value: str) -> Optional[str]:
+    """Validate a straight bet number (0, 00 or 1-36)"""
+    try:
+        num = int(bet_value) if bet_value != "00" else 37
+    except ValueError:
+        return "Invalid number format!"
+    if num not in VALID_NUMBERS:
+        return "Invalid number! Choose 0, 00, or 1-36"
+    return None
 
-roulette_agent = Agent(
-    model=model_choice,
-    deps_type=GameState,
-    system_prompt=(
-        "You are a roulette dealer. For every bet, you MUST follow this exact sequence:\n"
-        "1. Call place_bet to validate and place the bet - ALWAYS relay the exact message from place_bet to inform about bet capping\n"
-        "2. Call spin_wheel to spin the roulette wheel\n"
-        "3. Call check_results to determine if they won/lost and update their balance\n\n"
-        "IMPORTANT: If place_bet says a bet was capped, you MUST inform the player about the capping before spinning.\n"
-        "When players say 'all in', 'put it all', 'everything', or similar, "
-        "use their entire current balance as the bet amount. "
-        "Available bet types: straight (single number), color (red/black), odd_even, high_low. "
-        "Be friendly and concise."
-    ),
-)
 
+def choice_validator(choices: frozenset, error: str) -> Callable[[str], Optional[str]]:
+    """Build a validator that only accepts one of `choices`"""
+    return lambda bet_value: None if bet_value in choices else error
 
-@roulette_agent.tool
-async def spin_wheel(ctx: RunContext[GameState]) -> str:
-    """Spin the roulette wheel and return the winning number"""
-    winning_number = random.choice(ROULETTE_NUMBERS)
-    ctx.deps.winning_number = winning_number
-    color = get_number_color(winning_number)
-    formatted_number = format_number(winning_number)
 
-    result = f"🎰 The wheel spins... and lands on {formatted_number} ({color})!"
-    ctx.deps.last_spin_result = result
-    return result
+# Validators per bet type, each returns an error message or None if valid
+BET_VALIDATORS: dict[BetType, Callable[[str], Optional[str]]] = {
+    "straight": validate_straight,
+    "color": choice_validator(
+        frozenset({"red", "black"}), "Invalid color! Choose 'red' or 'black'"
+    ),
+    "odd_even": choice_validator(
+        frozenset({"odd", "even"}), "Invalid choice! Choose 'odd' or 'even'"
+    ),
+    "high_low": choice_validator(
+        frozenset({"high", "low"}),
+        "Invalid choice! Choose 'high' (19-36) or 'low' (1-18)",
+    ),
+}
 
 
-@roulette_agent.tool
-async def place_bet(
-    ctx: RunContext[GameState], bet_type: str, bet_value: str, amount: int
-) -> str:
-    """Place a bet on the roulette table"""
+def validate_bet(
+    state: GameState, bet_type: BetType, bet_value: str, amount: int
+) -> tuple[int, str]:
+    """Validate a bet, returning the amount to stake (0 if invalid) and a message"""
     if amount <= 0:
-        return " Bet amount must be positive!"
+        return 0, " Bet amount must be positive!"
 
-    was_capped = amount > ctx.deps.balance
+    was_capped = amount > state.balance
     if was_capped:
-        amount = ctx.deps.balance
+        amount = state.balance
         if amount <= 0:
-            return "You have no money left to bet!"
+            return 0, "You have no money left to bet!"
 
-    # Validate bet types
-    valid_bet_types = ["straight", "color", "odd_even", "high_low"]
-    if bet_type not in valid_bet_types:
-        return f"Invalid bet type! Valid types: {', '.join(valid_bet_types)}"
-
-    # Validate bet values based on type
-    if bet_type == "straight":
-        try:
-            num = int(bet_value) if bet_value != "00" else 37
-            if num not in ROULETTE_NUMBERS:
-                return "Invalid number! Choose 0, 00, or 1-36"
-        except ValueError:
-            return "Invalid number format!"
-    elif bet_type == "color" and bet_value not in ["red", "black"]:
-        return "Invalid color! Choose 'red' or 'black'"
-    elif bet_type == "odd_even" and bet_value not in ["odd", "even"]:
-        return "Invalid choice! Choose 'odd' or 'even'"
-    elif bet_type == "high_low" and bet_value not in ["high", "low"]:
-        return "Invalid choice! Choose 'high' (19-36) or 'low' (1-18)"
+    # The bet type is checked by the tool schema, so only the value needs validating
+    error = BET_VALIDATORS[bet_type](bet_value)
+    if error:
+        return 0, error
 
     prefix = "Bet capped to your balance: £" if was_capped else "✅ Bet placed: £"
-    return f"{prefix}{amount} on {bet_type} {bet_value}"
+    return amount, f"{prefix}{amount} on {bet_type} {bet_value}"
 
 
-@roulette_agent.tool
-async def check_results(
-    ctx: RunContext[GameState], bet_type: str, bet_value: str, bet_amount: int
+def spin_and_record(state: GameState) -> str:
+    """Spin the wheel, store the winning number and describe the result"""
+    winning_number = state.next_spin
+    if winning_number < 0:
+        winning_number = random.randrange(38)
+    state.next_spin = -1
+    state.winning_number = winning_number
+    color = NUMBER_COLORS[winning_number]
+    formatted_number = format_number(winning_number)
+
+    result = f"🎰 The wheel spins... and lands on {formatted_number} ({color})!"
+    state.last_spin_result = result
+    return result
+
+
+def settle_bet(
+    state: GameState, bet_type: BetType, bet_value: str, bet_amount: int
 ) -> str:
-    """Check if the player won their bet and calculate payout"""
-    if ctx.deps.winning_number is None:
+    """Pay out or collect a bet against the last spin and update the balance"""
+    if state.winning_number < 0:
         return "No spin result available! Spin the wheel first."
 
+    bet_code = BET_TYPE_CODES[bet_type]
+
     # Convert bet_value for calculation
-    calc_bet_value = bet_value
-    if bet_type == "straight":
+    calc_bet_value: Union[str, int] = bet_value
+    if bet_code == BET_STRAIGHT:
         calc_bet_value = int(bet_value) if bet_value != "00" else 37
     payout = calculate_payout(
-        bet_type, bet_amount, ctx.deps.winning_number, calc_bet_value
+        bet_code, bet_amount, state.winning_number, calc_bet_value
     )
-    ctx.deps.balance -= bet_amount
+    state.balance -= bet_amount
 
     if payout > 0:
-        ctx.deps.balance += payout
-        return (
-            f"Winner! You won £{payout - bet_amount}! New balance: £{ctx.deps.balance}"
-        )
+        state.balance += payout
+        return f"Winner! You won £{payout - bet_amount}! New balance: £{state.balance}"
     else:
-        ctx.deps.balance = max(0, ctx.deps.balance)
+        state.balance = max(0, state.balance)
         return (
             f"BUST! You lost £{bet_amount} and are completely broke! Balance: £0"
-            if ctx.deps.balance == 0
-            else f"Sorry, you lost £{bet_amount}. New balance: £{ctx.deps.balance}"
+            if state.balance == 0
+            else f"Sorry, you lost £{bet_amount}. New balance: £{state.balance}"
         )
 
 
-@roulette_agent.tool
-async def get_balance(ctx: RunContext[GameState]) -> str:
-    return f"Your current balance: £{ctx.deps.balance}"
-
-
-@roulette_agent.tool
-async def get_game_rules(ctx: RunContext[GameState]) -> str:
-    return """ROULETTE RULES & PAYOUTS:
+GAME_RULES = """ROULETTE RULES & PAYOUTS:
 
 BET TYPES:
 • Straight (single number): Bet on one number (0, 00, 1-36) - Pays 35:1
@@ -171,8 +195,124 @@ NOTES:
 • Color, odd/even, and high/low bets lose on 0 and 00
 • You start with £1000"""
 
+model_choice = "openai:gpt-4o"
+
+SYSTEM_PROMPT = (
+    "You are a roulette dealer. For every bet, call play_round exactly once - "
+    "it validates the bet, spins the wheel and settles the result in one step.\n\n"
+    "IMPORTANT: ALWAYS relay the exact message from play_round - if it says a bet was capped, you MUST inform the player about the capping.\n"
+    "When players say 'all in', 'put it all', 'everything', or similar, "
+    "use their entire current balance as the bet amount. "
+    "Available bet types: straight (single number), color (red/black), odd_even, high_low. "
+    "Be friendly and concise."
+)
+
+
+async def play_round(
+    ctx: RunContext[GameState], bet_type: BetType, bet_value: str, amount: int
+) -> str:
+    """Place a bet, spin the wheel and settle the result in one step"""
+    amount, message = validate_bet(ctx.deps, bet_type, bet_value, amount)
+    if not amount:
+        return message
+    spin = spin_and_record(ctx.deps)
+    return f"{message}\n{spin}\n{settle_bet(ctx.deps, bet_type, bet_value, amount)}"
+
+
+async def spin_wheel(ctx: RunContext[GameState]) -> str:
+    """Spin the roulette wheel and return the winning number"""
+    return spin_and_record(ctx.deps)
+
+
+async def place_bet(
+    ctx: RunContext[GameState], bet_type: BetType, bet_value: str, amount: int
+) -> str:
+    """Place a bet on the roulette table"""
+    return validate_bet(ctx.deps, bet_type, bet_value, amount)[1]
+
+
+async def check_results(
+    ctx: RunContext[GameState], bet_type: BetType, bet_value: str, bet_amount: int
+) -> str:
+    """Check if the player won their bet and calculate payout"""
+    return settle_bet(ctx.deps, bet_type, bet_value, bet_amount)
+
+
+async def get_balance(ctx: RunContext[GameState]) -> str:
+    return f"Your current balance: £{ctx.deps.balance}"
+
 
-def main():
+async def get_game_rules(ctx: RunContext[GameState]) -> str:
+    return GAME_RULES
+
+
+@functools.lru_cache(maxsize=1)
+def get_roulette_agent() -> Agent[GameState, str]:
+    """Build the dealer agent on first use, so importing the game logic stays cheap"""
+    agent = Agent(model=model_choice, deps_type=GameState, system_prompt=SYSTEM_PROMPT)
+    for tool in (
+        play_round,
+        spin_wheel,
+        place_bet,
+        check_results,
+        get_balance,
+        get_game_rules,
+    ):
+        agent.tool(tool)
+    return agent
+
+
+async def read_input(prompt: str) -> str:
+    """Read a line without blocking the event loop"""
+    # A daemon thread rather than asyncio.to_thread, whose executor is joined
+    # on shutdown and would hang Ctrl+C until a line was entered
+    loop = asyncio.get_running_loop()
+    line: asyncio.Future[str] = loop.create_future()
+
+    def resolve(result: str, error: BaseException | None) -> None:
+        if not line.done():
+            if error is None:
+                line.set_result(result)
+            else:
+                line.set_exception(error)
+
+    def read() -> None:
+        try:
+            loop.call_soon_threadsafe(resolve, input(prompt), None)
+        except Exception as e:
+            loop.call_soon_threadsafe(resolve, "", e)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await line
+
+
+async def stream_reply(prompt: str, game_state: GameState) -> None:
+    """Run one dealer turn, printing the reply as it's generated"""
+    # run_stream would stop at the first text the model sends and skip any
+    # tool call that follows it, so drive the run node by node instead
+    async with get_roulette_agent().iter(prompt, deps=game_state) as run:
+        async for node in run:
+            if not Agent.is_model_request_node(node):
+                continue
+            async with node.stream(run.ctx) as response:
+                async for event in response:
+                    if isinstance(event, PartStartEvent):
+                        part = event.part
+                        if isinstance(part, ToolCallPart):
+                            # Any text the model sends after a tool call in
+                            # the same response is deliberately not printed,
+                            # the reply comes from the next response instead
+                            break
+                        if isinstance(part, TextPart):
+                            print(part.content, end="", flush=True)
+                    elif isinstance(event, PartDeltaEvent) and isinstance(
+                        event.delta, TextPartDelta
+                    ):
+                        print(event.delta.content_delta, end="", flush=True)
+    print()
+
+
+async def main():
     print("Welcome to Enhanced Roulette!")
     print("Type your bets in natural language, like:")
     print("- 'I bet £50 on red'")
@@ -183,28 +323,36 @@ def main():
     print("- Type 'quit' to exit\n")
 
     game_state = GameState()
+
+    async def reply(prompt: str) -> None:
+        await stream_reply(prompt, game_state)
+
+    async def farewell() -> None:
+        print(f"Thanks for playing! Final balance: £{game_state.balance}")
+
     commands = {
-        "quit": lambda: f"Thanks for playing! Final balance: £{game_state.balance}",
-        "rules": lambda: roulette_agent.run_sync(
-            "Show me the game rules", deps=game_state
-        ).output,
-        "balance": lambda: roulette_agent.run_sync(
-            "What's my balance?", deps=game_state
-        ).output,
+        "quit": farewell,
+        "rules": lambda: reply("Show me the game rules"),
+        "balance": lambda: reply("What's my balance?"),
     }
 
     while True:
-        user_input = input("🎯 Place your bet: ").strip().lower()
+        # The spin doesn't depend on the bet, so draw it while the player is
+        # still typing rather than during the model's tool call
+        if game_state.next_spin < 0:
+            game_state.next_spin = random.randrange(38)
+
+        user_input = await read_input("🎯 Place your bet: ")
+        user_input = user_input.strip().lower()
 
         if user_input in commands:
-            print(commands[user_input]())
+            await commands[user_input]()
             if user_input == "quit":
                 break
             continue
 
         try:
-            result = roulette_agent.run_sync(user_input, deps=game_state)
-            print(result.output)
+            await reply(user_input)
 
             if game_state.balance <= 0:
                 print("\nGAME OVER! You've lost all your money!")
@@ -217,4 +365,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        # The input thread may still be blocked on stdin, which would hang or
+        # abort normal interpreter shutdown, so leave straight away
+        print(flush=True)
+        os._exit(130)
@@ -1,12 +1,51 @@
-import json
+import asyncio
 import os
 
+import httpx
+import orjson
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# One pooled HTTP/2 client for the whole process, so concurrent and repeated
+# requests reuse the same TCP and TLS connection
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        timeout=httpx.Timeout(30.0, connect=5.0),
+    ),
+)
+
+# Built once and sent unchanged on every request
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "roulette_wheel",
+            "description": "Check if the square is a winner",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "square": {
+                        "type": "integer",
+                        "description": "The roulette square number the customer is betting on",
+                    }
+                },
+                "required": ["square"],
+            },
+        },
+    }
+]
+
+SYSTEM_PROMPT = (
+    "Use the `roulette_wheel` function to see if the "
+    "customer has won based on the number they provide. "
+    "Extract the number from their message and check if they won. "
+    "Return true if they won, false if they lost."
+)
 
 
 def roulette_wheel(square: int, winning_number: int) -> str:
@@ -14,45 +53,17 @@ def roulette_wheel(square: int, winning_number: int) -> str:
     return "winner" if square == winning_number else "loser"
 
 
-def run_roulette_game(user_message: str, winning_number: int) -> bool:
+async def run_roulette_game(user_message: str, winning_number: int) -> bool:
     """
     Run a roulette game using OpenAI API with function calling
     """
-
-    tools = [
-        {
-            "type": "function",
-            "function": {
-                "name": "roulette_wheel",
-                "description": "Check if the square is a winner",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "square": {
-                            "type": "integer",
-                            "description": "The roulette square number the customer is betting on",
-                        }
-                    },
-                    "required": ["square"],
-                },
-            },
-        }
-    ]
-
-    system_prompt = (
-        "Use the `roulette_wheel` function to see if the "
-        "customer has won based on the number they provide. "
-        "Extract the number from their message and check if they won. "
-        "Return true if they won, false if they lost."
-    )
-
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_message},
     ]
 
-    response = client.chat.completions.create(
-        model="gpt-4o", messages=messages, tools=tools, tool_choice="auto"
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini", messages=messages, tools=TOOLS, tool_choice="auto"
     )
 
     message = response.choices[0].message
@@ -61,7 +72,7 @@ def run_roulette_game(user_message: str, winning_number: int) -> bool:
     if message.tool_calls:
         for tool_call in message.tool_calls:
             if tool_call.function.name == "roulette_wheel":
-                function_args = json.loads(tool_call.function.arguments)
+                function_args = orjson.loads(tool_call.function.arguments)
                 square = function_args["square"]
 
                 result = roulette_wheel(square, winning_number)
@@ -70,11 +81,28 @@ def run_roulette_game(user_message: str, winning_number: int) -> bool:
     return False
 
 
-if __name__ == "__main__":
+async def run_roulette_games(games: list[tuple[str, int]]) -> list[bool]:
+    """
+    Run several independent roulette games concurrently
+    """
+    return await asyncio.gather(
+        *(run_roulette_game(message, winning) for message, winning in games)
+    )
+
+
+async def main() -> None:
     success_number = 18
 
-    result1 = run_roulette_game("Put my money on square eighteen", success_number)
-    print(f"Result 1: {result1}")
+    async with client:
+        results = await run_roulette_games(
+            [
+                ("Put my money on square eighteen", success_number),
+                ("I bet five is the winner", success_number),
+            ]
+        )
+    for i, result in enumerate(results, start=1):
+        print(f"Result {i}: {result}")
 
-    result2 = run_roulette_game("I bet five is the winner", success_number)
-    print(f"Result 2: {result2}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import pytest
+from pydantic_ai.messages import ModelMessage, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+import roulette_enhanced
+from roulette_enhanced import GameState, get_roulette_agent, stream_reply
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    # The real model is never called, but building its client needs a key
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    get_roulette_agent.cache_clear()
+    yield get_roulette_agent()
+    get_roulette_agent.cache_clear()
+
+
+async def text_then_play_round(messages: list[ModelMessage], info: AgentInfo):
+    if any(isinstance(part, ToolReturnPart) for m in messages for part in m.parts):
+        yield "Good luck next time!"
+        return
+    yield "Sure, spinning now! "
+    args = {"bet_type": "color", "bet_value": "red", "amount": 100}
+    yield {0: DeltaToolCall(name="play_round", json_args=json.dumps(args))}
+
+
+def test_stream_reply_runs_tools_after_text(agent, monkeypatch, capsys):
+    monkeypatch.setattr(roulette_enhanced.random, "randrange", lambda n: 2)  # black
+    state = GameState()
+
+    with agent.override(model=FunctionModel(stream_function=text_then_play_round)):
+        asyncio.run(stream_reply("£100 on red", state))
+
+    assert state.winning_number == 2
+    assert state.balance == 900
+    assert capsys.readouterr().out == "Sure, spinning now! Good luck next time!\n"
@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from tools import (
+    fetch_local_weather,
+    fetch_weather,
+    lookup_user_location,
+    register_tools,
+    ttl_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cached in (lookup_user_location, fetch_weather, fetch_local_weather):
+        cached.cache_clear()
+
+
+def relay_local_weather(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+    for m in messages:
+        for part in m.parts:
+            if isinstance(part, ToolReturnPart):
+                return ModelResponse(parts=[TextPart(part.content)])
+    return ModelResponse(parts=[ToolCallPart("get_current_weather", {})])
+
+
+def weather_for(
+    ip_api: httpx.Response, local_place: str, wttr_status: int = 200
+) -> tuple[str, list[str]]:
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.host == "ip-api.com":
+            return ip_api
+        if wttr_status != 200:
+            return httpx.Response(wttr_status)
+        if request.url.path == "/":
+            return httpx.Response(200, text=f"{local_place}|Sunny +20°C")
+        return httpx.Response(200, text="Cloudy +12°C")
+
+    agent = Agent(FunctionModel(relay_local_weather), deps_type=httpx.AsyncClient)
+    register_tools(agent)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return (await agent.run("What's the weather?", deps=client)).output
+
+    return asyncio.run(run()), requested
+
+
+LEEDS = httpx.Response(
+    200, json={"status": "success", "city": "Leeds", "regionName": "England"}
+)
+
+
+def test_local_weather_used_when_places_agree():
+    reply, requested = weather_for(LEEDS, "Leeds, United Kingdom")
+    assert reply == "Weather in Leeds, England: Sunny +20°C"
+    assert "/Leeds, England" not in requested
+
+
+def test_targeted_weather_when_places_disagree():
+    reply, requested = weather_for(LEEDS, "Bradford, United Kingdom")
+    assert reply == "Weather in Leeds, England: Cloudy +12°C"
+    assert "/Leeds, England" in requested
+
+
+def test_targeted_weather_when_ip_lookup_fails():
+    reply, requested = weather_for(httpx.Response(500), "Leeds, United Kingdom")
+    assert reply == "Weather in London: Cloudy +12°C"
+    assert "/London" in requested
+
+
+def test_failed_weather_names_the_fallback_location():
+    reply, _ = weather_for(httpx.Response(503), "Leeds, United Kingdom", 503)
+    assert reply.startswith("Sorry, couldn't get weather for London. Error:")
+
+
+def test_ttl_cache_drops_oldest_beyond_maxsize():
+    calls = []
+
+    @ttl_cache(60, key=lambda name: name, maxsize=2)
+    async def lookup(name: str) -> str:
+        calls.append(name)
+        return name.upper()
+
+    async def run():
+        for name in ("a", "b", "c", "c", "b", "a"):
+            assert await lookup(name) == name.upper()
+
+    asyncio.run(run())
+    assert calls == ["a", "b", "c", "a"]
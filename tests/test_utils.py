@@ -0,0 +1,21 @@
+import asyncio
+
+from utils import coalesce_latest
+
+
+def test_coalesce_latest_flushes_held_chunk_when_stream_stalls():
+    async def chunks():
+        yield "Hel"
+        yield "Hello"
+        await asyncio.sleep(0.5)
+        yield "Hello, world"
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        return [(c, loop.time() - start) async for c in coalesce_latest(chunks())]
+
+    received = asyncio.run(run())
+    assert [c for c, _ in received] == ["Hel", "Hello", "Hello, world"]
+    # "Hello" was held for its window, not until the stream resumed
+    assert received[1][1] < 0.25